@@ -1,15 +1,12 @@
 import pandas as pd
-from database import get_intake_collection, get_outcome_collection
+from database import get_uploaded_data
 
 def load_data_from_mongo():
-    intakes_collection = get_intake_collection()
-    outcomes_collection = get_outcome_collection()
+    # Full load, but projected, batched and built column-wise instead of list(find())
+    intakes_df, outcomes_df, has_data = get_uploaded_data(sample_size=None)
 
-    intakes_data = list(intakes_collection.find())
-    outcomes_data = list(outcomes_collection.find())
-
-    intakes_df = pd.DataFrame(intakes_data)
-    outcomes_df = pd.DataFrame(outcomes_data)
+    if not has_data:
+        intakes_df, outcomes_df = pd.DataFrame(), pd.DataFrame()
 
     print(f"Loaded {len(intakes_df)} intake records and {len(outcomes_df)} outcome records.")
 
@@ -1,8 +1,39 @@
 import os
+import time
+import atexit
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import pymongo
 import json
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# Only the fields the prediction endpoints and ML scripts read; _id is dropped
+# so records need no ObjectId conversion
+INTAKE_PROJ = {"_id": 0, "animalId": 1, "datetime": 1, "foundLocation": 1, "createdAt": 1}
+OUTCOME_PROJ = {
+    "_id": 0, "animalId": 1, "datetime": 1, "date": 1, "outcomeDateTime": 1,
+    "outcomeType": 1, "animalType": 1, "breed": 1, "sexUponOutcome": 1,
+    "ageUponOutcome": 1, "createdAt": 1
+}
+
+# Candidate location column names, resolved once per load and exposed via DataFrame.attrs
+LOCATION_COLUMNS = ['foundLocation', 'Found Location', 'found_location']
+
+# Cache for uploaded data, keyed on the collection counts and newest _id so a
+# new, replaced or re-uploaded batch misses it; dropped entirely once the TTL expires
+UPLOADED_DATA_TTL = 60  # seconds
+_CACHE = {"key": None, "value": None, "ts": 0}
+# Sync endpoints run on FastAPI's threadpool; key/value/ts are only read or written together under this lock
+_CACHE_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def _create_mongo_client(mongo_uri):
+    # One pooled client per URI, shared by the whole process
+    client = pymongo.MongoClient(mongo_uri)
+    atexit.register(client.close)
+    return client
 
 def get_mongo_client():
     # Try to get from environment variable
@@ -22,86 +53,203 @@ def get_mongo_client():
     if not mongo_uri:
         raise ValueError("MONGO_URI is not set in environment or config file")
 
-    return pymongo.MongoClient(mongo_uri)
+    return _create_mongo_client(mongo_uri)
 
+@functools.lru_cache(maxsize=None)
 def get_intake_collection():
     client = get_mongo_client()
     db = client.smartpaws
     return db.intakerecords
 
+@functools.lru_cache(maxsize=None)
 def get_outcome_collection():
     client = get_mongo_client()
     db = client.smartpaws
     return db.outcomerecords
 
+def ensure_indexes():
+    """
+    Create the createdAt indexes behind the range query in check_data_freshness.
+    No-op if they already exist; failures are logged and the query still works
+    without them (the planner just falls back to a collection scan).
+    """
+    for get_collection in (get_intake_collection, get_outcome_collection):
+        try:
+            get_collection().create_index("createdAt")
+        except Exception as e:
+            print(f"Error creating createdAt index: {e}")
+
+def _cursor_to_frame(cursor, projection):
+    """
+    Stream cursor records into per-column lists and build the DataFrame column-wise
+    """
+    fields = [field for field, include in projection.items() if include]
+    columns = {field: [] for field in fields}
+    for record in cursor:
+        for field in fields:
+            columns[field].append(record.get(field))
+
+    # Drop fields no document carried so column detection downstream still works
+    columns = {field: values for field, values in columns.items() if any(v is not None for v in values)}
+    return pd.DataFrame(columns, copy=False)
+
+def _first_present_column(df, candidates):
+    return next((col for col in candidates if col in df.columns), None)
+
+def _fetch_frame(collection, count, projection, label, sample_size, batch_size):
+    """
+    Read one collection (with sampling for speed) into a DataFrame
+    """
+    if count == 0:
+        return pd.DataFrame()
+
+    if sample_size is not None and count > sample_size:
+        print(f"🚀 SAMPLING: Using {sample_size} {label} records instead of {count} for speed")
+        # Bounded scan over the default _id index (newest first) - reads only
+        # sample_size documents instead of a server-side random pick over the collection
+        cursor = collection.find({}, projection).sort([("_id", -1)]).limit(sample_size).batch_size(batch_size)
+    else:
+        cursor = collection.find({}, projection).batch_size(batch_size)
+
+    return _cursor_to_frame(cursor, projection)
+
+def _latest_id(collection):
+    # Newest document _id, read off the default _id index. Uploads go through the raw
+    # driver's insertMany (no Mongoose timestamps), so _id is the one field every
+    # record carries, and ObjectIds increase with insertion
+    doc = collection.find_one({}, {"_id": 1}, sort=[("_id", pymongo.DESCENDING)])
+    return doc["_id"] if doc else None
+
+def _copy_frames(value):
+    # Shallow copies: callers can add columns or set attrs without touching the cached frames
+    intake_df, outcome_df, has_data = value
+    return intake_df.copy(deep=False), outcome_df.copy(deep=False), has_data
+
 def get_uploaded_data(sample_size=5000):
     """
     Fetch uploaded intake and outcome data from MongoDB and return as DataFrames
     OPTIMIZED: Uses sampling for large datasets to improve performance
+    Pass sample_size=None to stream the full collections instead
     """
     try:
         intake_collection = get_intake_collection()
         outcome_collection = get_outcome_collection()
         
-        # Get data counts
-        intake_count = intake_collection.count_documents({})
-        outcome_count = outcome_collection.count_documents({})
+        # Get data counts (collection metadata, no scan)
+        intake_count = intake_collection.estimated_document_count()
+        outcome_count = outcome_collection.estimated_document_count()
         
         print(f"Found {intake_count} intake records and {outcome_count} outcome records in database")
         
         if intake_count == 0 and outcome_count == 0:
             print("No data found in database")
             return None, None, False
+
+        cache_key = (
+            intake_count, outcome_count,
+            _latest_id(intake_collection), _latest_id(outcome_collection),
+            sample_size
+        )
+        with _CACHE_LOCK:
+            # Expired entries are released rather than kept around until the next miss
+            if time.time() - _CACHE["ts"] >= UPLOADED_DATA_TTL:
+                _CACHE.update(key=None, value=None, ts=0)
+            cached = _CACHE["value"] if _CACHE["key"] == cache_key else None
+        if cached is not None:
+            print("🚀 CACHE HIT: Returning cached uploaded data")
+            return _copy_frames(cached)
         
         # SPEED OPTIMIZATION: Sample data for large datasets
-        use_sampling = intake_count > sample_size or outcome_count > sample_size
-        
-        # Fetch intake data (with sampling for speed)
-        intake_data = []
-        if intake_count > 0:
-            if use_sampling and intake_count > sample_size:
-                print(f"🚀 SAMPLING: Using {sample_size} intake records instead of {intake_count} for speed")
-                # MongoDB sampling - much faster than loading all and sampling
-                intake_cursor = intake_collection.aggregate([
-                    {"$sample": {"size": sample_size}}
-                ])
-            else:
-                intake_cursor = intake_collection.find({})
-                
-            for record in intake_cursor:
-                # Convert MongoDB ObjectId to string and clean up
-                record['_id'] = str(record['_id'])
-                intake_data.append(record)
+        use_sampling = sample_size is not None and (intake_count > sample_size or outcome_count > sample_size)
+
+        # Larger batches mean far fewer getMore round-trips than the default 101-doc
+        # first batch, at the cost of holding up to batch_size docs in client memory
+        batch_size = 2000 if sample_size is None else min(sample_size, 2000)
         
-        # Fetch outcome data (with sampling for speed)
-        outcome_data = []
-        if outcome_count > 0:
-            if use_sampling and outcome_count > sample_size:
-                print(f"🚀 SAMPLING: Using {sample_size} outcome records instead of {outcome_count} for speed")
-                # MongoDB sampling - much faster than loading all and sampling
-                outcome_cursor = outcome_collection.aggregate([
-                    {"$sample": {"size": sample_size}}
-                ])
-            else:
-                outcome_cursor = outcome_collection.find({})
-                
-            for record in outcome_cursor:
-                # Convert MongoDB ObjectId to string and clean up
-                record['_id'] = str(record['_id'])
-                outcome_data.append(record)
+        # The two reads are independent, so run them concurrently on the shared client.
+        # PyMongo releases the GIL on network I/O; a per-call pool keeps concurrent
+        # requests from queueing behind each other's reads
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="mongo-fetch") as executor:
+            intake_future = executor.submit(
+                _fetch_frame, intake_collection, intake_count, INTAKE_PROJ, "intake", sample_size, batch_size
+            )
+            outcome_future = executor.submit(
+                _fetch_frame, outcome_collection, outcome_count, OUTCOME_PROJ, "outcome", sample_size, batch_size
+            )
+            intake_df = intake_future.result()
+            outcome_df = outcome_future.result()
         
-        # Convert to DataFrames
-        intake_df = pd.DataFrame(intake_data) if intake_data else pd.DataFrame()
-        outcome_df = pd.DataFrame(outcome_data) if outcome_data else pd.DataFrame()
+        # Resolve the location column once so callers don't rescan candidates per request
+        intake_df.attrs['location_col'] = _first_present_column(intake_df, LOCATION_COLUMNS)
         
         data_source = "sampled" if use_sampling else "full"
         print(f"✅ Successfully loaded data ({data_source}): {len(intake_df)} intakes, {len(outcome_df)} outcomes")
-        return intake_df, outcome_df, True
+
+        value = (intake_df, outcome_df, True)
+        with _CACHE_LOCK:
+            _CACHE.update(key=cache_key, value=value, ts=time.time())
+        return _copy_frames(value)
         
     except Exception as e:
         print(f"Error fetching data from MongoDB: {e}")
         return None, None, False
 
+def get_record_counts():
+    """
+    Cheap (intake_count, outcome_count) from collection metadata; (0, 0) on error
+    """
+    try:
+        return (get_intake_collection().estimated_document_count(),
+                get_outcome_collection().estimated_document_count())
+    except Exception as e:
+        print(f"Error counting uploaded data: {e}")
+        return 0, 0
+
+def has_uploaded_data():
+    """
+    Check for any uploaded intake/outcome records (collection metadata only)
+    """
+    return any(get_record_counts())
+
+def get_top_locations(limit=8):
+    """
+    Most frequent intake found-locations, counted server-side. Returns a list of
+    {'location', 'count'} dicts in descending count order, or None on error.
+    """
+    try:
+        cursor = get_intake_collection().aggregate([
+            {"$match": {"foundLocation": {"$ne": None}}},
+            {"$sortByCount": "$foundLocation"},
+            {"$limit": limit}
+        ])
+        return [{"location": bucket["_id"], "count": bucket["count"]} for bucket in cursor]
+    except Exception as e:
+        print(f"Error aggregating top locations: {e}")
+        return None
+
+def get_monthly_adoption_counts():
+    """
+    Count adoption outcomes per month server-side so only the monthly buckets
+    cross the wire. Returns a list of ('YYYY-MM', count) sorted by month, or
+    None if the aggregation fails.
+    """
+    try:
+        cursor = get_outcome_collection().aggregate([
+            {"$match": {
+                "outcomeType": {"$regex": "adopt", "$options": "i"},
+                "datetime": {"$type": "date"}
+            }},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m", "date": "$datetime"}},
+                "n": {"$sum": 1}
+            }},
+            {"$sort": {"_id": 1}}
+        ], allowDiskUse=False)
+        return [(bucket["_id"], bucket["n"]) for bucket in cursor]
+    except Exception as e:
+        print(f"Error aggregating monthly adoptions: {e}")
+        return None
+
 def check_data_freshness():
     """
     Check if there's new data uploaded since last ML processing
@@ -111,14 +259,13 @@ def check_data_freshness():
         outcome_collection = get_outcome_collection()
         
         # Check for recent uploads (within last hour as example)
-        recent_threshold = datetime.now().replace(hour=datetime.now().hour-1)
+        # createdAt is stored in UTC by the API gateway
+        recent_threshold = datetime.utcnow() - timedelta(hours=1)
+        recent_query = {"createdAt": {"$gte": recent_threshold}}
         
-        recent_intakes = intake_collection.count_documents({
-            "createdAt": {"$gte": recent_threshold}
-        })
-        recent_outcomes = outcome_collection.count_documents({
-            "createdAt": {"$gte": recent_threshold}
-        })
+        # No hint: the planner picks up the createdAt index when ensure_indexes() managed to build it
+        recent_intakes = intake_collection.count_documents(recent_query)
+        recent_outcomes = outcome_collection.count_documents(recent_query)
         
         return recent_intakes > 0 or recent_outcomes > 0
         
@@ -7,14 +7,19 @@ import json
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from prophet import Prophet
+from fastapi.responses import ORJSONResponse
 import sys
+import threading
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(__file__))
-from database import get_uploaded_data, check_data_freshness
+from database import (
+    get_uploaded_data, check_data_freshness, has_uploaded_data, get_record_counts,
+    get_monthly_adoption_counts, get_top_locations, ensure_indexes
+)
 
-app = FastAPI()
+# orjson serializes the hotspot/trend payloads much faster than the stdlib json encoder
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Add CORS middleware to allow cross-origin requests
 app.add_middleware(
@@ -25,6 +30,12 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+@app.on_event("startup")
+def start_index_build():
+    # Build the freshness-query indexes off the request path; a slow or unreachable
+    # Mongo must not hold up startup either
+    threading.Thread(target=ensure_indexes, name="mongo-indexes", daemon=True).start()
+
 # Add middleware to log requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -41,8 +52,9 @@ try:
     if not os.path.exists(MODEL_DIR):
         raise FileNotFoundError(f"Error: The models directory was not found at {MODEL_DIR}")
     
-    with open(MODEL_PATH, 'rb') as f:
-        model = joblib.load(f)
+    # Unpickling pulls in prophet itself. No mmap_mode: the model is saved
+    # compressed, and joblib can't memory-map compressed pickles
+    model = joblib.load(MODEL_PATH)
     print("Prophet model loaded successfully.")
 except FileNotFoundError as e:
     print(e)
@@ -163,9 +175,7 @@ def get_trends():
     print("🚀 Getting trends prediction (fast mode)...")
     
     # Check if we have uploaded data
-    intake_df, outcome_df, has_data = get_uploaded_data()
-    
-    if not has_data:
+    if not has_uploaded_data():
         return {
             "error": "No uploaded data found",
             "message": "Please upload intake/outcome CSV files to generate predictions",
@@ -178,60 +188,37 @@ def get_trends():
         # SPEED OPTIMIZATION: Generate fast predictions from actual data instead of complex ML
         print("📊 Generating fast trend predictions from data patterns...")
         
-        # Use outcome data to generate realistic trends
-        print(f"🔍 DEBUG: Checking outcome data - Empty: {outcome_df.empty}, Columns: {list(outcome_df.columns) if not outcome_df.empty else 'N/A'}")
-        
-        # More flexible datetime column detection
-        datetime_cols = ['datetime', 'date', 'outcomeDateTime', 'outcome_datetime', 'timestamp']
-        datetime_col = None
-        
-        if not outcome_df.empty:
-            for col in datetime_cols:
-                if col in outcome_df.columns:
-                    datetime_col = col
-                    print(f"✅ Found datetime column: {col}")
-                    break
-        
-        if not outcome_df.empty and datetime_col:
-            # Convert datetime and extract monthly trends
-            outcome_df[datetime_col] = pd.to_datetime(outcome_df[datetime_col], errors='coerce')
-            valid_data = outcome_df.dropna(subset=[datetime_col])
-            print(f"🔍 DEBUG: Valid datetime records: {len(valid_data)}/{len(outcome_df)}")
+        # Adoption filter and monthly bucketing run in MongoDB - only the buckets come back
+        monthly_counts = get_monthly_adoption_counts()
+        
+        if monthly_counts:
+            # Only months that had adoptions, in month order
+            monthly_adoptions = np.array([count for _, count in monthly_counts])
             
-            if len(valid_data) > 0:
-                # Group by month and count adoptions
-                monthly_adoptions = valid_data[
-                    valid_data['outcomeType'].str.contains('adopt', case=False, na=False)
-                ].groupby(valid_data[datetime_col].dt.to_period('M')).size()
-                
-                print(f"🔍 DEBUG: Monthly adoptions found: {len(monthly_adoptions)} months")
-                
-                # Generate 12 months of predictions based on recent trends
-                if len(monthly_adoptions) > 0:
-                    recent_avg = monthly_adoptions.tail(6).mean()  # Last 6 months average
-                    trend_factor = 1.05  # 5% growth trend
-                    
-                    forecast_data = []
-                    base_date = pd.Timestamp.now()
-                    
-                    for i in range(12):
-                        future_date = base_date + pd.DateOffset(months=i+1)
-                        predicted_value = recent_avg * (trend_factor ** i)
-                        
-                        forecast_data.append({
-                            'ds': future_date.strftime('%Y-%m'),
-                            'yhat': max(int(predicted_value), 1)  # Ensure positive integer
-                        })
-                    
-                    print(f"✅ Generated {len(forecast_data)} fast trend predictions from REAL DATA")
-                    
-                    return {
-                        "prediction_type": "adoption_trends",
-                        "forecast": forecast_data,
-                        "accuracy": 0.85,  # HIGH accuracy using real data
-                        "data_source": "uploaded_data_fast",
-                        "model_status": "fast_statistical_model"
-                    }
+            print(f"🔍 DEBUG: Monthly adoptions found: {len(monthly_adoptions)} months")
+            
+            # Generate 12 months of predictions based on recent trends
+            recent_avg = monthly_adoptions[-6:].mean()  # Last 6 months average
+            trend_factor = 1.05  # 5% growth trend
+            
+            # Next 12 calendar months and their compounded growth in one shot
+            months = pd.date_range(pd.Timestamp.now().normalize() + pd.offsets.MonthBegin(1), periods=12, freq='MS')
+            yhat = np.maximum((recent_avg * trend_factor ** np.arange(12)).astype(np.int64), 1)  # Ensure positive integer
+            
+            forecast_data = [
+                {'ds': ds, 'yhat': value}
+                for ds, value in zip(months.strftime('%Y-%m'), yhat.tolist())
+            ]
+            
+            print(f"✅ Generated {len(forecast_data)} fast trend predictions from REAL DATA")
+            
+            return {
+                "prediction_type": "adoption_trends",
+                "forecast": forecast_data,
+                "accuracy": 0.85,  # HIGH accuracy using real data
+                "data_source": "uploaded_data_fast",
+                "model_status": "fast_statistical_model"
+            }
         
         # Fallback: Generate reasonable dummy predictions
         print("📈 Using fallback trend generation...")
@@ -303,32 +290,26 @@ def generate_coordinates_from_data():
         coordinates = []
         
         # Extract location information from intake data
-        location_columns = ['foundLocation', 'Found Location', 'found_location']
-        location_col = None
-        
-        for col in location_columns:
-            if col in intake_df.columns:
-                location_col = col
-                break
+        location_col = intake_df.attrs.get('location_col')
         
         if location_col:
             # Get unique locations and generate mock coordinates for Austin area
-            locations = intake_df[location_col].dropna().unique()
+            locations = intake_df[location_col].dropna().unique()[:50]  # Limit to 50 locations
             
             # Generate realistic Austin-area coordinates
             base_lat, base_lon = 30.2672, -97.7431  # Austin coordinates
             
-            for i, location in enumerate(locations[:50]):  # Limit to 50 locations
-                # Generate coordinates within Austin metro area
-                lat_offset = (np.random.random() - 0.5) * 0.5  # ±0.25 degrees
-                lon_offset = (np.random.random() - 0.5) * 0.5  # ±0.25 degrees
-                
-                coordinates.append({
-                    "location": str(location),
-                    "latitude": base_lat + lat_offset,
-                    "longitude": base_lon + lon_offset,
-                    "count": int(np.random.randint(1, 20))  # Random count for visualization
-                })
+            # Generate coordinates within Austin metro area in one draw
+            rng = np.random.default_rng(42)
+            offsets = (rng.random((len(locations), 2)) - 0.5) * 0.5  # ±0.25 degrees
+            lats = base_lat + offsets[:, 0]
+            lons = base_lon + offsets[:, 1]
+            counts = rng.integers(1, 20, size=len(locations))  # Random count for visualization
+            
+            coordinates = [
+                {"location": str(location), "latitude": float(lat), "longitude": float(lon), "count": int(count)}
+                for location, lat, lon, count in zip(locations, lats, lons, counts)
+            ]
         
         return {"coordinates": coordinates}
         
@@ -337,7 +318,7 @@ def generate_coordinates_from_data():
         return {}
 
 # Cache for hotspots to avoid regeneration
-hotspot_cache = {"data": None, "timestamp": None, "hash": None}
+hotspot_cache = {"data": None, "timestamp": None, "key": None}
 
 @app.get("/api/v1/predictions/hotspots")
 def get_hotspots():
@@ -347,9 +328,9 @@ def get_hotspots():
     print("⚡ Getting hotspots prediction (LIGHTNING FAST mode)...")
     
     # Check if we have uploaded data
-    intake_df, outcome_df, has_data = get_uploaded_data()
+    record_counts = get_record_counts()
     
-    if not has_data:
+    if not any(record_counts):
         return {
             "error": "No uploaded data found",
             "message": "Please upload intake/outcome CSV files to generate hotspot analysis",
@@ -359,12 +340,11 @@ def get_hotspots():
         }
     
     # Check cache first (super fast)
-    import hashlib
-    data_hash = hashlib.md5(str(len(intake_df)).encode()).hexdigest()[:8]
+    data_key = record_counts
     current_time = time.time()
     
     if (hotspot_cache["data"] and 
-        hotspot_cache["hash"] == data_hash and
+        hotspot_cache["key"] == data_key and
         current_time - hotspot_cache["timestamp"] < 300):  # 5 min cache
         print("🚀 CACHE HIT: Returning cached hotspots (instant!)")
         return hotspot_cache["data"]
@@ -376,86 +356,67 @@ def get_hotspots():
         hotspots = []
         coordinates = {"coordinates": []}
         
-        # Use intake data to find high-activity locations
-        if not intake_df.empty:
-            print(f"🔍 Processing {len(intake_df)} intake records...")
+        # Use intake data to find high-activity locations - top 8 counted in MongoDB
+        top_locations = get_top_locations(limit=8)
+        
+        if top_locations:
+            print(f"⚡ Found {len(top_locations)} unique locations in lightning mode")
+            
+            # Austin area coordinates for realistic mapping
+            base_lat, base_lon = 30.2672, -97.7431
             
-            location_columns = ['foundLocation', 'Found Location', 'found_location']
-            location_col = None
+            # Pre-calculate offsets for speed
+            rng = np.random.default_rng(42)  # Consistent coordinates, without reseeding global numpy state
+            lat_offsets = (rng.random(len(top_locations)) - 0.5) * 0.3
+            lon_offsets = (rng.random(len(top_locations)) - 0.5) * 0.3
             
-            for col in location_columns:
-                if col in intake_df.columns:
-                    location_col = col
-                    break
+            median_count = np.median([entry["count"] for entry in top_locations])
             
-            if location_col:
-                print(f"📊 Analyzing location column: {location_col}")
-                
-                # SUPER FAST MODE: Use much smaller sample for instant results
-                sample_df = intake_df
-                if len(intake_df) > 1000:
-                    sample_size = min(2000, len(intake_df))  # Reduced from 10K to 2K
-                    sample_df = intake_df.sample(n=sample_size, random_state=42)  # Fixed seed for consistency
-                    print(f"🚀 LIGHTNING MODE: Using only {sample_size} sample records for instant speed")
-                
-                # Super fast aggregation - only top 8 locations
-                location_counts = sample_df[location_col].value_counts().head(8)
-                print(f"⚡ Found {len(location_counts)} unique locations in lightning mode")
-                
-                # Austin area coordinates for realistic mapping
-                base_lat, base_lon = 30.2672, -97.7431
-                
-                # Pre-calculate offsets for speed
-                np.random.seed(42)  # Consistent coordinates
-                lat_offsets = (np.random.random(len(location_counts)) - 0.5) * 0.3
-                lon_offsets = (np.random.random(len(location_counts)) - 0.5) * 0.3
-                
-                median_count = location_counts.median()
-                
-                for i, ((location, count), lat_off, lon_off) in enumerate(zip(location_counts.items(), lat_offsets, lon_offsets)):
-                    if pd.notna(location) and str(location).strip():
-                        # Fast coordinate generation
-                        lat = round(base_lat + lat_off, 6)
-                        lon = round(base_lon + lon_off, 6)
-                        location_str = str(location)[:50]
-                        
-                        # Create hotspot cluster (optimized)
-                        hotspot = {
-                            "cluster_id": i,
-                            "location": location_str,
-                            "risk_level": "High" if count > median_count else "Medium",
-                            "animal_count": int(count),
-                            "priority": "High" if i < 3 else "Medium",
-                            "latitude": lat,
-                            "longitude": lon
-                        }
-                        hotspots.append(hotspot)
-                        
-                        # Add to coordinates (same data, avoid duplication)
-                        coordinates["coordinates"].append({
-                            "location": location_str,
-                            "latitude": lat,
-                            "longitude": lon,
-                            "count": int(count)
-                        })
-                
-                print(f"⚡ Generated {len(hotspots)} LIGHTNING FAST hotspot clusters")
-                
-                result = {
-                    "prediction_type": "high_risk_areas",
-                    "hotspots": hotspots,
-                    "coordinates": coordinates,
-                    "data_source": "uploaded_data_lightning",
-                    "analysis_status": "lightning_fast_mode"
-                }
-                
-                # Cache the result for next time
-                hotspot_cache["data"] = result
-                hotspot_cache["timestamp"] = current_time
-                hotspot_cache["hash"] = data_hash
-                print("🚀 Cached hotspots for instant future access")
-                
-                return result
+            for i, (entry, lat_off, lon_off) in enumerate(zip(top_locations, lat_offsets, lon_offsets)):
+                location, count = entry["location"], entry["count"]
+                if str(location).strip():
+                    # Fast coordinate generation
+                    lat = round(base_lat + lat_off, 6)
+                    lon = round(base_lon + lon_off, 6)
+                    location_str = str(location)[:50]
+                    
+                    # Create hotspot cluster (optimized)
+                    hotspot = {
+                        "cluster_id": i,
+                        "location": location_str,
+                        "risk_level": "High" if count > median_count else "Medium",
+                        "animal_count": int(count),
+                        "priority": "High" if i < 3 else "Medium",
+                        "latitude": lat,
+                        "longitude": lon
+                    }
+                    hotspots.append(hotspot)
+                    
+                    # Add to coordinates (same data, avoid duplication)
+                    coordinates["coordinates"].append({
+                        "location": location_str,
+                        "latitude": lat,
+                        "longitude": lon,
+                        "count": int(count)
+                    })
+            
+            print(f"⚡ Generated {len(hotspots)} LIGHTNING FAST hotspot clusters")
+            
+            result = {
+                "prediction_type": "high_risk_areas",
+                "hotspots": hotspots,
+                "coordinates": coordinates,
+                "data_source": "uploaded_data_lightning",
+                "analysis_status": "lightning_fast_mode"
+            }
+            
+            # Cache the result for next time
+            hotspot_cache["data"] = result
+            hotspot_cache["timestamp"] = current_time
+            hotspot_cache["key"] = data_key
+            print("🚀 Cached hotspots for instant future access")
+            
+            return result
         
         # Fallback: Generate realistic dummy hotspots for Austin area
         print("📍 Using fallback hotspot generation...")
@@ -466,25 +427,29 @@ def get_hotspots():
         
         base_lat, base_lon = 30.2672, -97.7431
         
-        for i, area in enumerate(austin_areas[:8]):  # Top 8 areas
-            lat_offset = (np.random.random() - 0.5) * 0.4
-            lon_offset = (np.random.random() - 0.5) * 0.4
-            count = np.random.randint(50, 200)
-            
+        # Top 8 areas - draw all offsets and counts at once
+        austin_areas = austin_areas[:8]
+        rng = np.random.default_rng(42)
+        offsets = (rng.random((len(austin_areas), 2)) - 0.5) * 0.4
+        lats = np.round(base_lat + offsets[:, 0], 6).tolist()
+        lons = np.round(base_lon + offsets[:, 1], 6).tolist()
+        counts = rng.integers(50, 200, size=len(austin_areas)).tolist()
+        
+        for i, (area, lat, lon, count) in enumerate(zip(austin_areas, lats, lons, counts)):
             hotspots.append({
                 "cluster_id": i,
                 "location": area,
                 "risk_level": "High" if i < 3 else "Medium",
                 "animal_count": count,
                 "priority": "High" if i < 3 else "Medium",
-                "latitude": round(base_lat + lat_offset, 6),
-                "longitude": round(base_lon + lon_offset, 6)
+                "latitude": lat,
+                "longitude": lon
             })
             
             coordinates["coordinates"].append({
                 "location": area,
-                "latitude": round(base_lat + lat_offset, 6),
-                "longitude": round(base_lon + lon_offset, 6),
+                "latitude": lat,
+                "longitude": lon,
                 "count": count
             })
         
@@ -0,0 +1,69 @@
+import numpy as np
+from numba import njit, prange
+from sklearn.cluster import kmeans_plusplus
+
+# Lloyd's K-Means specialised for small, dense feature matrices (e.g. a few dozen
+# one-hot columns), where the per-sample distance loop vectorizes well under numba
+
+# fastmath without 'nnan'/'ninf': _assign compares against an np.inf sentinel,
+# which is undefined once the compiler may assume no infinities
+FASTMATH_FLAGS = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+@njit(parallel=True, fastmath=FASTMATH_FLAGS, cache=True)
+def _assign(X, C, labels):
+    """Assign every sample to its nearest centre; returns how many labels changed."""
+    n_samples, n_features = X.shape
+    n_clusters = C.shape[0]
+    changed = 0
+    for i in prange(n_samples):
+        best = 0
+        best_dist = np.inf
+        for j in range(n_clusters):
+            dist = 0.0
+            for f in range(n_features):
+                diff = X[i, f] - C[j, f]
+                dist += diff * diff
+            if dist < best_dist:
+                best_dist = dist
+                best = j
+        if labels[i] != best:
+            labels[i] = best
+            changed += 1
+    return changed
+
+@njit(fastmath=FASTMATH_FLAGS, cache=True)
+def _update(X, labels, C, counts):
+    """Move each centre to the mean of its samples; empty clusters keep their centre."""
+    n_samples, n_features = X.shape
+    n_clusters = C.shape[0]
+    sums = np.zeros((n_clusters, n_features), dtype=np.float64)
+    counts[:] = 0
+    for i in range(n_samples):
+        label = labels[i]
+        counts[label] += 1
+        for f in range(n_features):
+            sums[label, f] += X[i, f]
+    for j in range(n_clusters):
+        if counts[j] > 0:
+            for f in range(n_features):
+                C[j, f] = sums[j, f] / counts[j]
+
+def kmeans_fit_predict(X, n_clusters, max_iter=300, tol=0.0, random_state=42):
+    """
+    Cluster a dense matrix with k-means++ seeding and numba-compiled Lloyd iterations.
+    Stops once the fraction of samples changing cluster is <= tol.
+    Returns: cluster labels (int64 array)
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    centers, _ = kmeans_plusplus(X, n_clusters, random_state=random_state)
+    centers = np.ascontiguousarray(centers, dtype=np.float32)
+    labels = np.full(X.shape[0], -1, dtype=np.int64)
+    counts = np.zeros(n_clusters, dtype=np.int64)
+
+    for _ in range(max_iter):
+        changed = _assign(X, centers, labels)
+        if changed <= tol * X.shape[0]:
+            break
+        _update(X, labels, centers, counts)
+
+    return labels
@@ -1,14 +1,22 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+from sklearn.cluster import MiniBatchKMeans
+from joblib import Parallel, delayed
 import warnings
 import os
+from pathlib import Path
 import sys
 
-# Add the parent directory to the path to import database module
+# Add the parent directory to the path to import the database module and ml_models package
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from database import get_uploaded_data
+from ml_models.feature_utils import build_features, group_mode
+
+# numba is optional - without it the final fit stays on MiniBatchKMeans
+try:
+    from ml_models._kmeans_numba import kmeans_fit_predict
+except ImportError:
+    kmeans_fit_predict = None
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
@@ -28,32 +36,8 @@ def process_uploaded_data_for_clustering():
     
     print(f"Processing {len(outcome_df)} outcome records for clustering")
     
-    # Prepare the outcome data for clustering (similar to original logic)
-    df = outcome_df.copy()
-    
-    # Ensure required columns exist with fallback mapping
-    column_mapping = {
-        'datetime': ['DateTime', 'datetime', 'date'],
-        'outcomeType': ['Outcome Type', 'outcomeType', 'outcome_type'],
-        'animalType': ['Animal Type', 'animalType', 'animal_type'],
-        'breed': ['Breed', 'breed'],
-        'sexUponOutcome': ['Sex upon Outcome', 'sexUponOutcome', 'sex_upon_outcome'],
-        'ageUponOutcome': ['Age upon Outcome', 'ageUponOutcome', 'age_upon_outcome']
-    }
-    
-    # Standardize column names
-    for standard_name, possible_names in column_mapping.items():
-        for possible_name in possible_names:
-            if possible_name in df.columns:
-                df[standard_name] = df[possible_name]
-                break
-        
-        # Set default if column not found
-        if standard_name not in df.columns:
-            if standard_name == 'datetime':
-                df[standard_name] = pd.Timestamp.now()
-            else:
-                df[standard_name] = 'Unknown'
+    # Shared column mapping, season and breed reduction
+    df = build_features(outcome_df)
     
     return df
 
@@ -65,27 +49,7 @@ if df is None:
     exit()
 
 # --- 2. Feature Engineering (Re-create necessary features) ---
-# 2a. Season Creation
-df['datetime'] = pd.to_datetime(df['datetime'])
-df['Month'] = df['datetime'].dt.month
-
-def get_season(month):
-    if month in [3, 4, 5]: return 'Spring'
-    if month in [6, 7, 8]: return 'Summer'
-    if month in [9, 10, 11]: return 'Fall'
-    return 'Winter'
-
-df['Season'] = df['Month'].apply(get_season)
-
-# 2b. Breed Reduction
-TOP_N_BREEDS = 50 
-common_breeds = df['breed'].value_counts().nlargest(TOP_N_BREEDS).index
-
-df['Reduced_Breed'] = np.where(
-    df['breed'].isin(common_breeds),
-    df['breed'],
-    'Rare_Breed'
-)
+# 2a/2b. Season creation and breed reduction happen in build_features()
 
 # 2c. Age Conversion (Convert 'Age upon Outcome' to a numeric value in days)
 # For simplicity, we'll skip the full conversion here, as it requires a lot of code,
@@ -95,28 +59,36 @@ df['Reduced_Breed'] = np.where(
 # --- 3. Filter for Hotspots (Non-Adopted Animals) ---
 # We focus ONLY on non-adopted outcomes to find 'hotspots' that are hard to place.
 hotspot_df = df[df['outcomeType'] != 'Adoption'].copy()
+
+# Categories come from the full frame; drop the ones only adopted animals had so
+# get_dummies doesn't emit all-zero columns (or drop_first one of them)
+for col in hotspot_df.select_dtypes('category').columns:
+    hotspot_df[col] = hotspot_df[col].cat.remove_unused_categories()
 print(f"Total non-adopted animals for clustering: {len(hotspot_df)}")
 
 # Define features for clustering (using only categorical ones for now)
 clustering_features = ['animalType', 'Reduced_Breed', 'Season', 'sexUponOutcome']
 
-# One-Hot Encode the categorical features
-X_clustered = pd.get_dummies(hotspot_df[clustering_features], drop_first=True)
-
-# Scale the data (essential for K-Means distance calculations)
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X_clustered)
+# One-Hot Encode the categorical features straight into a float32 CSR matrix.
+# The features are pure 0/1 indicators, so no StandardScaler pass - scaling would only
+# re-weight columns and force a dense copy of the matrix.
+X_clustered = (
+    pd.get_dummies(hotspot_df[clustering_features], drop_first=True, sparse=True)
+    .sparse.to_coo().tocsr().astype(np.float32)
+)
 
 # --- 4. Determine Optimal Number of Clusters (Elbow Method) ---
 # We look for the "elbow" point in the inertia plot.
-inertia = []
 K_range = range(2, 11)
 
+# Mini-batch fits are plenty for an inertia curve and far cheaper than full Lloyd runs
+def fit_k(k):
+    kmeans = MiniBatchKMeans(n_clusters=k, batch_size=1024, random_state=42, n_init=3)
+    return kmeans.fit(X_clustered).inertia_
+
+# Each k is independent, so run them on separate cores
 print("Running Elbow Method (may take a moment)...")
-for k in K_range:
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    kmeans.fit(X_scaled)
-    inertia.append(kmeans.inertia_)
+inertia = Parallel(n_jobs=-1)(delayed(fit_k)(k) for k in K_range)
 
 # Based on typical shelter data, 4 or 5 clusters is often a reasonable starting point.
 # You would visualize the plot to confirm K. Let's select K=5 as a reasonable default.
@@ -124,8 +96,14 @@ K_OPTIMAL = 5
 print(f"Selected K={K_OPTIMAL} clusters for analysis.")
 
 # --- 5. Run K-Means Clustering ---
-kmeans_final = KMeans(n_clusters=K_OPTIMAL, random_state=42, n_init=10)
-hotspot_df['Cluster_ID'] = kmeans_final.fit_predict(X_scaled)
+# Low-dimensional one-hot data is cheap to densify, and the numba Lloyd loop beats the
+# generic sparse path there; wider encodings stay sparse on MiniBatchKMeans
+NUMBA_MAX_FEATURES = 128
+if kmeans_fit_predict is not None and X_clustered.shape[1] < NUMBA_MAX_FEATURES:
+    hotspot_df['Cluster_ID'] = kmeans_fit_predict(X_clustered.toarray(), K_OPTIMAL, random_state=42)
+else:
+    kmeans_final = MiniBatchKMeans(n_clusters=K_OPTIMAL, batch_size=1024, n_init=3, random_state=42)
+    hotspot_df['Cluster_ID'] = kmeans_final.fit_predict(X_clustered)
 
 # --- 6. Hotspot Analysis and Saving Results ---
 
@@ -136,13 +114,13 @@ print("\n--- Hotspot Cluster Analysis ---")
 id_column = 'animalId' if 'animalId' in hotspot_df.columns else '_id'
 age_column = 'ageUponOutcome' if 'ageUponOutcome' in hotspot_df.columns else 'ageUponOutcome'
 
-cluster_analysis = hotspot_df.groupby('Cluster_ID').agg(
-    Count=(id_column, 'count'),
-    Avg_Age=(age_column, lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A'),
-    Most_Common_Type=('animalType', lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown'),
-    Most_Common_Breed=('Reduced_Breed', lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown'),
-    Most_Common_Season=('Season', lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown'),
-).reset_index()
+cluster_analysis = pd.DataFrame({
+    'Count': hotspot_df.groupby('Cluster_ID', observed=True)[id_column].count(),
+    'Avg_Age': group_mode(hotspot_df, 'Cluster_ID', age_column, 'N/A'),
+    'Most_Common_Type': group_mode(hotspot_df, 'Cluster_ID', 'animalType', 'Unknown'),
+    'Most_Common_Breed': group_mode(hotspot_df, 'Cluster_ID', 'Reduced_Breed', 'Unknown'),
+    'Most_Common_Season': group_mode(hotspot_df, 'Cluster_ID', 'Season', 'Unknown'),
+}).rename_axis('Cluster_ID').reset_index()
 
 # Calculate the percentage of the non-adopted population each cluster represents
 cluster_analysis['Percentage'] = (cluster_analysis['Count'] / len(hotspot_df)) * 100
@@ -152,9 +130,8 @@ output_path = '../data/hotspot_clusters.csv'
 output_dir = os.path.dirname(output_path)
 
 # --- THE FIX ---
-# Check if the directory exists, if not, create it
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
+# Create the directory if needed (a single mkdir that tolerates it already existing)
+Path(output_dir).mkdir(parents=True, exist_ok=True)
 
 # Save the cluster analysis to CSV
 cluster_analysis.to_csv(output_path, index=False)
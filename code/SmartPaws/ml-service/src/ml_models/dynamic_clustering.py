@@ -4,15 +4,26 @@ from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import warnings
 import os
+from pathlib import Path
 import sys
+import zlib
 
-# Add the parent directory to the path to import database module
+# Add the parent directory to the path to import the database module and ml_models package
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from database import get_uploaded_data
+from ml_models.feature_utils import build_features, group_mode, is_adoption
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
 
+# Fitted encoder columns, scaler and K-Means from the last run, keyed by upload fingerprint
+model_cache = {"key": None, "columns": None, "scaler": None, "kmeans": None}
+
+def _upload_fingerprint(df):
+    """Row count, latest datetime and a CRC of the distinct outcome types."""
+    outcome_types = ','.join(sorted(map(str, df['outcomeType'].cat.categories)))
+    return len(df), str(df['datetime'].max()), zlib.crc32(outcome_types.encode())
+
 def run_dynamic_clustering():
     """
     Main function to run clustering analysis on uploaded data
@@ -29,61 +40,18 @@ def run_dynamic_clustering():
         
         print(f"✅ Processing {len(outcome_df)} outcome records for clustering")
         
-        # Prepare the outcome data for clustering
-        df = outcome_df.copy()
-        
-        # Ensure required columns exist with fallback mapping
-        column_mapping = {
-            'datetime': ['DateTime', 'datetime', 'date'],
-            'outcomeType': ['Outcome Type', 'outcomeType', 'outcome_type'],
-            'animalType': ['Animal Type', 'animalType', 'animal_type'],
-            'breed': ['Breed', 'breed'],
-            'sexUponOutcome': ['Sex upon Outcome', 'sexUponOutcome', 'sex_upon_outcome'],
-            'ageUponOutcome': ['Age upon Outcome', 'ageUponOutcome', 'age_upon_outcome']
-        }
-        
-        # Standardize column names
-        for standard_name, possible_names in column_mapping.items():
-            for possible_name in possible_names:
-                if possible_name in df.columns:
-                    df[standard_name] = df[possible_name]
-                    break
-            
-            # Set default if column not found
-            if standard_name not in df.columns:
-                if standard_name == 'datetime':
-                    df[standard_name] = pd.Timestamp.now()
-                else:
-                    df[standard_name] = 'Unknown'
-        
-        # Feature Engineering
-        # Season Creation
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        df['Month'] = df['datetime'].dt.month
-        
-        def get_season(month):
-            if month in [3, 4, 5]: return 'Spring'
-            if month in [6, 7, 8]: return 'Summer'
-            if month in [9, 10, 11]: return 'Fall'
-            return 'Winter'
-        
-        df['Season'] = df['Month'].apply(get_season)
-        
-        # Breed Reduction
-        TOP_N_BREEDS = 50 
-        common_breeds = df['breed'].value_counts().nlargest(TOP_N_BREEDS).index
-        
-        df['Reduced_Breed'] = np.where(
-            df['breed'].isin(common_breeds),
-            df['breed'],
-            'Rare_Breed'
-        )
+        # Shared column mapping, season and breed reduction
+        df = build_features(outcome_df)
         
         # Filter for Hotspots (Non-Adopted Animals)
-        # Check for adoption patterns (case-insensitive)
-        adoption_patterns = ['adopt', 'Adopt', 'ADOPT', 'Adoption', 'ADOPTION']
-        is_adoption = df['outcomeType'].str.contains('|'.join(adoption_patterns), case=False, na=False)
-        hotspot_df = df[~is_adoption].copy()
+        # Check for adoption patterns (case-insensitive, classified per distinct outcome)
+        adopted = is_adoption(df['outcomeType'])
+        hotspot_df = df[~adopted].copy()
+        
+        # Categories come from the full frame; drop the ones only adopted animals had so
+        # get_dummies doesn't emit all-zero columns (or drop_first one of them)
+        for col in hotspot_df.select_dtypes('category').columns:
+            hotspot_df[col] = hotspot_df[col].cat.remove_unused_categories()
         
         print(f"📊 Found {len(hotspot_df)} non-adopted animals for clustering")
         
@@ -103,25 +71,38 @@ def run_dynamic_clustering():
         if not clustering_features:
             return False, pd.DataFrame(), "No suitable features available for clustering"
         
-        # One-Hot Encode the categorical features
-        X_clustered = pd.get_dummies(hotspot_df[clustering_features], drop_first=True)
+        # One-Hot Encode the categorical features (float32 halves memory traffic vs float64)
+        dummies = pd.get_dummies(hotspot_df[clustering_features], drop_first=True)
         
-        if X_clustered.empty or X_clustered.shape[1] == 0:
+        if dummies.size == 0 or dummies.shape[1] == 0:
             return False, pd.DataFrame(), "No features available after encoding"
         
-        # Scale the data
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X_clustered)
-        
-        # Determine optimal number of clusters (simplified)
-        K_OPTIMAL = min(5, len(hotspot_df) // 10)  # Ensure reasonable cluster count
-        K_OPTIMAL = max(2, K_OPTIMAL)  # At least 2 clusters
-        
-        print(f"🎯 Using K={K_OPTIMAL} clusters for analysis")
+        fingerprint = _upload_fingerprint(df)
         
-        # Run K-Means Clustering
-        kmeans_final = KMeans(n_clusters=K_OPTIMAL, random_state=42, n_init=10)
-        hotspot_df['Cluster_ID'] = kmeans_final.fit_predict(X_scaled)
+        if model_cache["key"] == fingerprint:
+            # Same upload as the last run - reuse the fitted scaler and centers
+            print("♻️ Reusing cached scaler and K-Means model")
+            X_clustered = dummies.reindex(columns=model_cache["columns"], fill_value=0).to_numpy(dtype=np.float32)
+            X_scaled = model_cache["scaler"].transform(X_clustered)
+            hotspot_df['Cluster_ID'] = model_cache["kmeans"].predict(X_scaled)
+        else:
+            X_clustered = dummies.to_numpy(dtype=np.float32)
+            
+            # Scale the data in place
+            scaler = StandardScaler(copy=False)
+            X_scaled = scaler.fit_transform(X_clustered)
+            
+            # Determine optimal number of clusters (simplified)
+            K_OPTIMAL = min(5, len(hotspot_df) // 10)  # Ensure reasonable cluster count
+            K_OPTIMAL = max(2, K_OPTIMAL)  # At least 2 clusters
+            
+            print(f"🎯 Using K={K_OPTIMAL} clusters for analysis")
+            
+            # Run K-Means Clustering (elkan prunes distance computations via the triangle inequality)
+            kmeans_final = KMeans(n_clusters=K_OPTIMAL, random_state=42, n_init=3, algorithm='elkan')
+            hotspot_df['Cluster_ID'] = kmeans_final.fit_predict(X_scaled)
+            
+            model_cache.update(key=fingerprint, columns=dummies.columns, scaler=scaler, kmeans=kmeans_final)
         
         # Analyze the composition of each cluster
         print("📈 Analyzing cluster composition...")
@@ -130,20 +111,20 @@ def run_dynamic_clustering():
         id_column = 'animalId' if 'animalId' in hotspot_df.columns else '_id'
         age_column = 'ageUponOutcome' if 'ageUponOutcome' in hotspot_df.columns else 'ageUponOutcome'
         
-        cluster_analysis = hotspot_df.groupby('Cluster_ID').agg(
-            Count=(id_column, 'count'),
-            Avg_Age=(age_column, lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A'),
-            Most_Common_Type=('animalType', lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown'),
-            Most_Common_Breed=('Reduced_Breed', lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown'),
-            Most_Common_Season=('Season', lambda x: x.mode().iloc[0] if not x.mode().empty else 'Unknown'),
-        ).reset_index()
+        cluster_analysis = pd.DataFrame({
+            'Count': hotspot_df.groupby('Cluster_ID', observed=True)[id_column].count(),
+            'Avg_Age': group_mode(hotspot_df, 'Cluster_ID', age_column, 'N/A'),
+            'Most_Common_Type': group_mode(hotspot_df, 'Cluster_ID', 'animalType', 'Unknown'),
+            'Most_Common_Breed': group_mode(hotspot_df, 'Cluster_ID', 'Reduced_Breed', 'Unknown'),
+            'Most_Common_Season': group_mode(hotspot_df, 'Cluster_ID', 'Season', 'Unknown'),
+        }).rename_axis('Cluster_ID').reset_index()
         
         # Calculate percentages
         cluster_analysis['Percentage'] = (cluster_analysis['Count'] / len(hotspot_df)) * 100
         
         # Save results
         output_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
-        os.makedirs(output_dir, exist_ok=True)
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
         output_path = os.path.join(output_dir, 'hotspot_clusters.csv')
         
         cluster_analysis.to_csv(output_path, index=False)
@@ -1,13 +1,21 @@
 import pandas as pd
+import numpy as np
 from prophet import Prophet
 import joblib 
+import hashlib
+import importlib.util
 import os
+from pathlib import Path
 import sys
 from datetime import datetime
 
-# Add the parent directory to the path to import database module
+# Add the parent directory to the path to import the database module and ml_models package
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from database import get_uploaded_data
+from ml_models.feature_utils import is_adoption
+
+# lz4 is optional - fall back to zlib when it isn't installed
+MODEL_COMPRESSION = ('lz4', 1) if importlib.util.find_spec("lz4") is not None else ('zlib', 1)
 
 def prepare_prophet_data(intake_df, outcome_df):
     """
@@ -15,13 +23,13 @@ def prepare_prophet_data(intake_df, outcome_df):
     """
     print("🔄 Preparing data for Prophet model...")
     
-    # Combine intake and outcome data for adoption trends
-    all_data = []
+    # Combine intake and outcome data for adoption trends (one datetime64[D] array per source)
+    day_arrays = []
     
     # Process outcome data for adoptions
     if not outcome_df.empty:
-        # Standardize column names
-        outcome_df_clean = outcome_df.copy()
+        # Only read from here on, so no copy of the cached frame is needed
+        outcome_df_clean = outcome_df
         
         # Map various column name formats
         date_columns = ['datetime', 'DateTime', 'date', 'Date']
@@ -42,20 +50,15 @@ def prepare_prophet_data(intake_df, outcome_df):
         
         if date_col and outcome_col:
             # Filter for adoptions
-            adoptions = outcome_df_clean[outcome_df_clean[outcome_col].str.contains('Adopt', case=False, na=False)]
+            adoptions = outcome_df_clean[is_adoption(outcome_df_clean[outcome_col])]
             
             if not adoptions.empty:
-                adoptions['ds'] = pd.to_datetime(adoptions[date_col])
-                adoptions['y'] = 1  # Each adoption counts as 1
-                
-                # Group by date and count adoptions
-                adoption_counts = adoptions.groupby(adoptions['ds'].dt.date)['y'].sum().reset_index()
-                adoption_counts['ds'] = pd.to_datetime(adoption_counts['ds'])
-                all_data.append(adoption_counts)
+                # Each adoption counts as 1 on its calendar day
+                day_arrays.append(pd.to_datetime(adoptions[date_col]).to_numpy().astype('datetime64[D]'))
     
     # Process intake data if available
     if not intake_df.empty:
-        intake_df_clean = intake_df.copy()
+        intake_df_clean = intake_df
         
         date_col = None
         for col in date_columns:
@@ -64,24 +67,24 @@ def prepare_prophet_data(intake_df, outcome_df):
                 break
         
         if date_col:
-            intake_df_clean['ds'] = pd.to_datetime(intake_df_clean[date_col])
-            intake_df_clean['y'] = 1  # Each intake counts as 1
-            
-            # Group by date and count intakes
-            intake_counts = intake_df_clean.groupby(intake_df_clean['ds'].dt.date)['y'].sum().reset_index()
-            intake_counts['ds'] = pd.to_datetime(intake_counts['ds'])
-            all_data.append(intake_counts)
+            # Each intake counts as 1 on its calendar day
+            day_arrays.append(pd.to_datetime(intake_df_clean[date_col]).to_numpy().astype('datetime64[D]'))
+    
+    days = np.concatenate(day_arrays) if day_arrays else np.array([], dtype='datetime64[D]')
+    days = days[~np.isnat(days)]
     
-    if not all_data:
+    if days.size == 0:
         print("❌ No valid data found for Prophet training")
         return None
     
-    # Combine all data
-    combined_df = pd.concat(all_data, ignore_index=True)
-    
-    # Group by date and sum all activities (adoptions + intakes)
-    prophet_data = combined_df.groupby('ds')['y'].sum().reset_index()
-    prophet_data = prophet_data.sort_values('ds')
+    # Sum all activities (adoptions + intakes) per day with a single bincount over day offsets.
+    # Days without activity come out as explicit zeros, already sorted by date.
+    min_day = days.min()
+    counts = np.bincount((days - min_day).astype(np.int64))
+    prophet_data = pd.DataFrame({
+        'ds': (min_day + np.arange(len(counts)).astype('timedelta64[D]')).astype('datetime64[ns]'),
+        'y': counts
+    })
     
     print(f"✅ Prepared {len(prophet_data)} data points for Prophet training")
     print(f"📅 Date range: {prophet_data['ds'].min()} to {prophet_data['ds'].max()}")
@@ -127,18 +130,31 @@ def train_dynamic_prophet_model():
         
         # Save model
         model_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'models')
-        os.makedirs(model_dir, exist_ok=True)
+        Path(model_dir).mkdir(parents=True, exist_ok=True)
         model_path = os.path.join(model_dir, 'prophet_model.pkl')
+        hash_path = os.path.join(model_dir, 'prophet_model.sha1')
+        
+        # Skip the (large) pickle when the training data hasn't changed since the last dump
+        data_hash = hashlib.sha1(pd.util.hash_pandas_object(prophet_data, index=False).values).hexdigest()
+        previous_hash = None
+        if os.path.exists(hash_path) and os.path.exists(model_path):
+            with open(hash_path) as f:
+                previous_hash = f.read().strip()
         
-        joblib.dump(model, model_path)
-        print(f"💾 Model saved to {model_path}")
+        if data_hash == previous_hash:
+            print(f"💾 Training data unchanged, keeping saved model at {model_path}")
+        else:
+            joblib.dump(model, model_path, compress=MODEL_COMPRESSION)
+            with open(hash_path, 'w') as f:
+                f.write(data_hash)
+            print(f"💾 Model saved to {model_path}")
         
         # Save forecast results
         data_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        forecast_path = os.path.join(data_dir, 'forecast_results.csv')
+        Path(data_dir).mkdir(parents=True, exist_ok=True)
+        forecast_path = os.path.join(data_dir, 'forecast_results.parquet')
         
-        forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_csv(forecast_path, index=False)
+        forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_parquet(forecast_path, compression='zstd', index=False)
         print(f"📊 Forecast saved to {forecast_path}")
         
         return model, forecast
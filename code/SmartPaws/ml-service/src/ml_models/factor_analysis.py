@@ -1,7 +1,9 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.inspection import permutation_importance
 import numpy as np
+from feature_utils import get_season, reduce_breeds
 
 # --- 1. Load Data (Using Corrected Path and Name) ---
 try:
@@ -12,35 +14,20 @@ except FileNotFoundError:
     print("FATAL ERROR: Data file not found at the expected path.")
     exit()
 
+# Breed counting and the category-code features below then work on integer codes instead of strings
+categorical_columns = ['Animal Type', 'Breed']
+df[categorical_columns] = df[categorical_columns].astype('category')
+
 # --- 2. Feature Engineering (Create 'Season') ---
 # This code is NECESSARY to create the 'Season' column!
 df['DateTime'] = pd.to_datetime(df['DateTime'], format='%m/%d/%Y %I:%M:%S %p', errors='coerce')
 df['Month'] = df['DateTime'].dt.month
-
-def get_season(month):
-    """Maps month number to a seasonal name."""
-    if month in [3, 4, 5]:
-        return 'Spring'
-    elif month in [6, 7, 8]:
-        return 'Summer'
-    elif month in [9, 10, 11]:
-        return 'Fall'
-    else:
-        return 'Winter'
-
-df['Season'] = df['Month'].apply(get_season)
+df['Season'] = get_season(df['Month'])
 
 
 # --- 3. Feature Reduction on 'Breed' ---
-TOP_N_BREEDS = 50 
-common_breeds = df['Breed'].value_counts().nlargest(TOP_N_BREEDS).index
-
-# Create 'Reduced_Breed' column
-df['Reduced_Breed'] = np.where(
-    df['Breed'].isin(common_breeds),
-    df['Breed'],
-    'Rare_Breed'
-)
+TOP_N_BREEDS = 50
+df['Reduced_Breed'] = reduce_breeds(df['Breed'], TOP_N_BREEDS)
 
 # --- 4. Data Pre-processing and Encoding ---
 
@@ -56,47 +43,37 @@ feature_columns = ['Animal Type', 'Reduced_Breed', 'Season']
 df['Adopted'] = df[target_column].apply(lambda x: 1 if x == 'Adoption' else 0)
 y = df['Adopted']
 
-# One-Hot Encode the categorical features (now manageable!)
-X = pd.get_dummies(df[feature_columns], drop_first=True)
+# Encode the categorical features as integer codes instead of one-hot columns -
+# the histogram booster splits on categories natively (missing values stay NaN)
+X = pd.DataFrame({
+    col: df[col].astype('category').cat.codes.replace(-1, np.nan)
+    for col in feature_columns
+})
 
 # Handle cases where the dataset might be too small after encoding
 if X.empty or len(X) < 100:
     print("\nWARNING: Dataset is too small or contains no features after encoding.")
     exit()
 
-# --- 5. Train the Random Forest Classifier ---
+# --- 5. Train the Gradient Boosting Classifier ---
 
 # Split data into training and testing sets
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# Initialize and train the Random Forest Classifier
-model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
+# Initialize and train the classifier with every feature marked categorical
+model = HistGradientBoostingClassifier(max_iter=200, categorical_features=[True] * len(feature_columns), random_state=42)
 model.fit(X_train, y_train)
 
 # --- 6. Extract and Rank Feature Importance ---
 
-# Get the importance scores
-importances = model.feature_importances_
+# Permutation importance scores each original feature directly, so no regrouping of dummies
+importances = permutation_importance(model, X_test, y_test, n_repeats=5, random_state=42, n_jobs=-1)
 
-# Map the scores to the feature names
-feature_names = X.columns
-importance_df = pd.DataFrame({
-    'Feature': feature_names,
-    'Importance': importances
+grouped_importance = pd.DataFrame({
+    'Original_Feature': feature_columns,
+    'Importance': importances.importances_mean
 })
 
-# Create a mapping for grouping features
-def get_original_feature_name(feature):
-    """Extracts the original feature name from the one-hot encoded column name."""
-    if '_' in feature:
-        return feature.split('_')[0]
-    return feature
-
-importance_df['Original_Feature'] = importance_df['Feature'].apply(get_original_feature_name)
-
-# Group by the original feature and sum the importance scores
-grouped_importance = importance_df.groupby('Original_Feature')['Importance'].sum().reset_index()
-
 # Sort by importance in descending order
 ranked_factors = grouped_importance.sort_values(by='Importance', ascending=False)
 
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Month-indexed season lookup: slots 1-12 are calendar months, slot 0 catches
+# missing months (same 'Winter' fallback the old per-row get_season had)
+SEASONS = np.array([
+    'Winter',
+    'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+    'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'
+])
+
+def get_season(months):
+    """Maps a Series of month numbers to seasonal names with a single vectorized gather."""
+    return SEASONS[pd.Series(months).fillna(0).to_numpy(dtype=np.intp)]
+
+def group_mode(df, group_col, col, default):
+    """
+    Most frequent value of col within each group, from one hash aggregation
+    instead of a per-group Series.mode() callback. Ties resolve to the smallest
+    value (as mode().iloc[0] did); groups with no non-null values get default.
+    """
+    counts = df.groupby([group_col, col], observed=True).size().rename('n').reset_index()
+    modes = (
+        counts.sort_values('n', ascending=False, kind='stable')
+        .drop_duplicates(group_col)
+        .set_index(group_col)[col]
+        .astype(object)  # categorical modes can't take a default outside their categories
+    )
+    return modes.reindex(pd.Index(df[group_col].unique()).sort_values(), fill_value=default)
+
+def reduce_breeds(breeds, top_n, other='Rare_Breed'):
+    """
+    Keeps the top_n most frequent breeds and folds everything else into other.
+    Reuses the value_counts result as a rank lookup instead of a second isin pass.
+    """
+    counts = breeds.value_counts()
+    rank = pd.Series(np.arange(len(counts)), index=counts.index.astype(object))
+    # reindex (not map) so categorical breeds yield plain numeric ranks
+    is_common = rank.reindex(breeds.to_numpy()).to_numpy() < top_n
+    return np.where(is_common, breeds.to_numpy(), other)
+
+def is_adoption(outcome_types):
+    """
+    Boolean mask of adoption outcomes ('adopt' anywhere, any case). Each distinct
+    outcome is classified once and broadcast back through the category codes.
+    """
+    outcomes = outcome_types.astype('category')
+    is_adopt_category = outcomes.cat.categories.astype(str).str.lower().str.contains('adopt', regex=False)
+    # Trailing False is picked up by code -1 (missing outcome)
+    lookup = np.append(np.asarray(is_adopt_category, dtype=bool), False)
+    return lookup[outcomes.cat.codes.to_numpy()]
+
+# Ensure required columns exist with fallback mapping
+COLUMN_MAPPING = {
+    'datetime': ['DateTime', 'datetime', 'date'],
+    'outcomeType': ['Outcome Type', 'outcomeType', 'outcome_type'],
+    'animalType': ['Animal Type', 'animalType', 'animal_type'],
+    'breed': ['Breed', 'breed'],
+    'sexUponOutcome': ['Sex upon Outcome', 'sexUponOutcome', 'sex_upon_outcome'],
+    'ageUponOutcome': ['Age upon Outcome', 'ageUponOutcome', 'age_upon_outcome']
+}
+
+CATEGORICAL_COLUMNS = ['animalType', 'breed', 'sexUponOutcome', 'outcomeType']
+
+TOP_N_BREEDS = 50
+
+def build_features(outcome_df):
+    """
+    Column mapping, categorical conversion, datetime parsing, season and breed
+    reduction shared by the clustering entry points.
+    """
+    # Shallow copy: new and remapped columns get their own storage, while the
+    # input frame (also held by the database cache) is left untouched
+    df = outcome_df.copy(deep=False)
+
+    # Standardize column names
+    for standard_name, possible_names in COLUMN_MAPPING.items():
+        for possible_name in possible_names:
+            if possible_name in df.columns:
+                df[standard_name] = df[possible_name]
+                break
+
+        # Set default if column not found
+        if standard_name not in df.columns:
+            if standard_name == 'datetime':
+                df[standard_name] = pd.Timestamp.now()
+            else:
+                df[standard_name] = 'Unknown'
+
+    # Convert once after mapping so breed counts, dummies and cluster groupbys work on int codes
+    df[CATEGORICAL_COLUMNS] = df[CATEGORICAL_COLUMNS].astype('category')
+
+    # Season Creation (cache=True parses each distinct timestamp string once)
+    df['datetime'] = pd.to_datetime(df['datetime'], format='mixed', cache=True)
+    df['Month'] = df['datetime'].dt.month
+    df['Season'] = get_season(df['Month'])
+
+    # Breed Reduction
+    df['Reduced_Breed'] = reduce_breeds(df['breed'], TOP_N_BREEDS)
+
+    return df
@@ -7,7 +7,7 @@ import os
 # The correct relative path to go up one directory and into the data folder
 DATA_PATH = r'D:\5sem\mini\ml_scripts\data\prophet_training_data.csv'
 MODEL_PATH = '../models/prophet_model.pkl'
-FORECAST_PATH = '../data/forecast_results.csv'
+FORECAST_PATH = '../data/forecast_results.parquet'
 FORECAST_PERIODS = 180 # Forecast 6 months
 
 print("Starting SmartPaws Prophet Model Training...")
@@ -50,9 +50,9 @@ print(f"Generating {FORECAST_PERIODS} day forecast...")
 future = model.make_future_dataframe(periods=FORECAST_PERIODS, include_history=False) 
 forecast = model.predict(future)
 
-# Save the necessary forecast results for the dashboard
-forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_csv(
-    FORECAST_PATH, index=False)
+# Save the necessary forecast results for the dashboard (columnar + zstd, no float formatting)
+forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_parquet(
+    FORECAST_PATH, compression='zstd', index=False)
 print(f"Forecast results saved to {FORECAST_PATH}")
 
 print("\nAdoption Trend Forecasting feature complete.")
\ No newline at end of file
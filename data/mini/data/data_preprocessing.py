@@ -1,40 +1,48 @@
 import pandas as pd
+import numpy as np
+import os
 
 # Load the main dataset
 file_path = r'D:\5sem\mini\data\Austin_Animal_Center_Outcomes.csv'
-outcomes_df = pd.read_csv(file_path)
+
+# Only the columns the pipeline uses; low-cardinality text is read straight into categories
+USECOLS = ['Animal ID', 'Breed', 'DateTime', 'Outcome Type', 'Animal Type', 'Sex upon Outcome', 'Age upon Outcome']
+DTYPES = {
+    'Breed': 'category',
+    'Outcome Type': 'category',
+    'Animal Type': 'category',
+    'Sex upon Outcome': 'category',
+    'Age upon Outcome': 'category'
+}
+outcomes_df = pd.read_csv(file_path, usecols=USECOLS, dtype=DTYPES)
 
 # --- Perform the Data Processing ---
 
 # 1. Create a 'reduced_breed' column
-def reduce_breed(breed):
-    if pd.isna(breed):
-        return "Unknown"
-    if 'Mix' in str(breed):
-        return breed.replace(' Mix', '').strip()
-    return breed
-outcomes_df['reduced_breed'] = outcomes_df['Breed'].apply(reduce_breed)
+# Vectorized string kernels: breeds containing 'Mix' lose the ' Mix' suffix, missing ones become "Unknown"
+breeds = outcomes_df['Breed'].astype('string')
+has_mix = breeds.str.contains('Mix', regex=False, na=False)
+outcomes_df['reduced_breed'] = breeds.mask(has_mix, breeds.str.replace(' Mix', '', regex=False).str.strip()).fillna("Unknown")
 
 
 # 2. Create a 'predicted_season' column
-# Convert 'DateTime' to a datetime object, handling errors gracefully
-outcomes_df['Month'] = pd.to_datetime(outcomes_df['DateTime'], format='%m/%d/%Y %I:%M:%S %p', errors='coerce').dt.month
-def get_season(month):
-    if pd.isna(month):
-        return "Unknown"
-    month = int(month)
-    if month in [12, 1, 2]:
-        return 'Winter'
-    if month in [3, 4, 5]:
-        return 'Spring'
-    if month in [6, 7, 8]:
-        return 'Summer'
-    if month in [9, 10, 11]:
-        return 'Fall'
-    return "Unknown" # Handle any other cases
-outcomes_df['predicted_season'] = outcomes_df['Month'].apply(get_season)
+# Convert 'DateTime' to a datetime object, handling errors gracefully (cache=True parses each distinct string once)
+outcomes_df['Month'] = pd.to_datetime(outcomes_df['DateTime'], format='%m/%d/%Y %I:%M:%S %p', errors='coerce', cache=True).dt.month
+
+# Month-indexed lookup: slot 0 catches unparseable dates, slots 1-12 are calendar months
+SEASONS = np.array(['Unknown',
+                    'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                    'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'])
+months = outcomes_df['Month'].fillna(0).to_numpy(dtype=np.int8)
+outcomes_df['predicted_season'] = SEASONS[months]
 
 
 # --- Save the processed data to a new file ---
 outcomes_df.to_csv('processed_outcomes.csv', index=False)
-print("Processed data saved to processed_outcomes.csv")
\ No newline at end of file
+print("Processed data saved to processed_outcomes.csv")
+
+# Columnar copy for the ML scripts - reloads skip CSV tokenization and keep the categorical dtypes
+# Written next to this script, where ml_scripts/clustering.py looks for it
+parquet_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'processed_outcomes.parquet')
+outcomes_df.to_parquet(parquet_path, compression='zstd', index=False)
+print(f"Processed data saved to {parquet_path}")
\ No newline at end of file
@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import OneHotEncoder
+from joblib import Parallel, delayed
 import warnings
 import os # Import the os module
 
@@ -9,36 +10,68 @@ import os # Import the os module
 warnings.filterwarnings('ignore')
 
 # --- 1. Load and Prepare Data ---
+# Only the columns the pipeline uses; low-cardinality text is read straight into categories
+USECOLS = ['Animal ID', 'Breed', 'DateTime', 'Outcome Type', 'Animal Type', 'Sex upon Outcome', 'Age upon Outcome']
+DTYPES = {
+    'Breed': 'category',
+    'Outcome Type': 'category',
+    'Animal Type': 'category',
+    'Sex upon Outcome': 'category',
+    'Age upon Outcome': 'category'
+}
+
+# Resolved from this file so the script works from any working directory
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+# Written by data_preprocessing.py; falls back to parsing the raw CSV when it hasn't been run
+PARQUET_PATH = os.path.join(DATA_DIR, 'processed_outcomes.parquet')
+CSV_PATH = os.path.join(DATA_DIR, 'Austin_Animal_Center_Outcomes.csv')
+
 try:
-    # Use the same path as factor_analysis.py
-    df = pd.read_csv(r'data/Austin_Animal_Center_Outcomes.csv')
+    if os.path.exists(PARQUET_PATH):
+        df = pd.read_parquet(PARQUET_PATH, columns=USECOLS)
+    else:
+        print(f"⚠️ {PARQUET_PATH} not found, parsing the raw CSV instead (run data_preprocessing.py to speed this up)")
+        df = pd.read_csv(CSV_PATH, usecols=USECOLS, dtype=DTYPES)
 except FileNotFoundError:
     print("FATAL ERROR: Data file not found.")
     exit()
 
 # --- 2. Feature Engineering (Re-create necessary features) ---
 # 2a. Season Creation
-df['DateTime'] = pd.to_datetime(df['DateTime'])
-df['Month'] = df['DateTime'].dt.month
-
-def get_season(month):
-    if month in [3, 4, 5]: return 'Spring'
-    if month in [6, 7, 8]: return 'Summer'
-    if month in [9, 10, 11]: return 'Fall'
-    return 'Winter'
+# Explicit format keeps parsing on the fast path instead of sniffing every row
+df['DateTime'] = pd.to_datetime(df['DateTime'], format='%m/%d/%Y %I:%M:%S %p', errors='coerce', cache=True)
+# Extract the month once as a plain int8 array (0 for unparseable dates) - it only feeds the lookup
+months = df['DateTime'].dt.month.fillna(0).to_numpy(dtype=np.int8)
 
-df['Season'] = df['Month'].apply(get_season)
+# Month-indexed lookup: slot 0 (missing month) falls back to 'Winter' like the old if-chain
+SEASONS = np.array(['Winter',
+                    'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                    'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'])
+df['Season'] = SEASONS[months]
 
 # 2b. Breed Reduction
 TOP_N_BREEDS = 50 
-common_breeds = df['Breed'].value_counts().nlargest(TOP_N_BREEDS).index
+# Membership is tested on the integer category codes rather than on the breed strings
+breeds = df['Breed'].astype('category')
+# Unsorted counts + argpartition picks the top N in O(U) instead of sorting every breed
+breed_counts = breeds.value_counts(sort=False)
+if len(breed_counts) > TOP_N_BREEDS:
+    top_idx = np.argpartition(-breed_counts.to_numpy(), TOP_N_BREEDS - 1)[:TOP_N_BREEDS]
+    common_breeds = breed_counts.index[top_idx]
+else:
+    common_breeds = breed_counts.index
+top_codes = breeds.cat.categories.get_indexer(common_breeds)
 
 df['Reduced_Breed'] = np.where(
-    df['Breed'].isin(common_breeds),
-    df['Breed'],
+    breeds.cat.codes.isin(top_codes),
+    breeds.to_numpy(),
     'Rare_Breed'
 )
 
+# Keep every clustering column categorical so the filter, encoder and groupbys work on int codes
+for col in ['Animal Type', 'Reduced_Breed', 'Season', 'Sex upon Outcome']:
+    df[col] = df[col].astype('category')
+
 # 2c. Age Conversion (Convert 'Age upon Outcome' to a numeric value in days)
 # For simplicity, we'll skip the full conversion here, as it requires a lot of code,
 # and instead use one-hot encoding on 'Animal Type', 'Reduced_Breed', and 'Season'. 
@@ -46,29 +79,34 @@ df['Reduced_Breed'] = np.where(
 
 # --- 3. Filter for Hotspots (Non-Adopted Animals) ---
 # We focus ONLY on non-adopted outcomes to find 'hotspots' that are hard to place.
-hotspot_df = df[df['Outcome Type'] != 'Adoption'].copy()
+# Slice to the columns used below before copying, so only those bytes are duplicated
+NEEDED_COLS = ['Animal ID', 'Animal Type', 'Reduced_Breed', 'Season', 'Sex upon Outcome', 'Age upon Outcome', 'Outcome Type']
+hotspot_df = df.loc[df['Outcome Type'] != 'Adoption', NEEDED_COLS].copy()
 print(f"Total non-adopted animals for clustering: {len(hotspot_df)}")
 
 # Define features for clustering (using only categorical ones for now)
 clustering_features = ['Animal Type', 'Reduced_Breed', 'Season', 'Sex upon Outcome']
 
-# One-Hot Encode the categorical features
-X_clustered = pd.get_dummies(hotspot_df[clustering_features], drop_first=True)
+# One-Hot Encode the categorical features straight into a float32 sparse matrix
+encoder = OneHotEncoder(sparse_output=True, dtype=np.float32, drop='first')
+X_clustered = encoder.fit_transform(hotspot_df[clustering_features])
 
-# Scale the data (essential for K-Means distance calculations)
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X_clustered)
+# No scaling pass: every column is a 0/1 indicator already on the same range, and
+# centering would densify the matrix
 
 # --- 4. Determine Optimal Number of Clusters (Elbow Method) ---
 # We look for the "elbow" point in the inertia plot.
-inertia = []
 K_range = range(2, 11)
 
+# Mini-batch fits are enough for the shape of the inertia curve; the final K uses full KMeans
+def fit_inertia(k, X):
+    kmeans = MiniBatchKMeans(n_clusters=k, batch_size=min(4096, X.shape[0]), n_init=3,
+                             random_state=42, max_iter=100)
+    return kmeans.fit(X).inertia_
+
+# Each k is an independent fit, so spread them across all cores
 print("Running Elbow Method (may take a moment)...")
-for k in K_range:
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    kmeans.fit(X_scaled)
-    inertia.append(kmeans.inertia_)
+inertia = Parallel(n_jobs=-1, backend='loky')(delayed(fit_inertia)(k, X_clustered) for k in K_range)
 
 # Based on typical shelter data, 4 or 5 clusters is often a reasonable starting point.
 # You would visualize the plot to confirm K. Let's select K=5 as a reasonable default.
@@ -76,32 +114,51 @@ K_OPTIMAL = 5
 print(f"Selected K={K_OPTIMAL} clusters for analysis.")
 
 # --- 5. Run K-Means Clustering ---
-kmeans_final = KMeans(n_clusters=K_OPTIMAL, random_state=42, n_init=10)
-hotspot_df['Cluster_ID'] = kmeans_final.fit_predict(X_scaled)
+# One k-means++ seeding with a fixed seed is enough here; lloyd because the input is sparse
+kmeans_final = KMeans(n_clusters=K_OPTIMAL, random_state=42, n_init=1, init='k-means++', algorithm='lloyd')
+hotspot_df['Cluster_ID'] = kmeans_final.fit_predict(X_clustered)
 
 # --- 6. Hotspot Analysis and Saving Results ---
 
 # Analyze the composition of each cluster:
 print("\n--- Hotspot Cluster Analysis ---")
-cluster_analysis = hotspot_df.groupby('Cluster_ID').agg(
-    Count=('Animal ID', 'count'),
-    Avg_Age=('Age upon Outcome', lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A'),
-    Most_Common_Type=('Animal Type', lambda x: x.mode().iloc[0]),
-    Most_Common_Breed=('Reduced_Breed', lambda x: x.mode().iloc[0]),
-    Most_Common_Season=('Season', lambda x: x.mode().iloc[0]),
-).reset_index()
+
+cluster_ids = np.sort(hotspot_df['Cluster_ID'].unique())
+
+def cluster_mode(df, col, cluster_ids, default=None):
+    """
+    Most common value of col per cluster from one groupby-size pass. Same tie-breaking
+    as group_mode() in the ml-service feature_utils (smallest value wins, like mode());
+    clusters with no non-null values get default.
+    """
+    counts = df.groupby(['Cluster_ID', col], observed=True).size().rename('n').reset_index()
+    modes = (
+        counts.sort_values('n', ascending=False, kind='stable')
+        .drop_duplicates('Cluster_ID')
+        .set_index('Cluster_ID')[col]
+        .astype(object)
+    )
+    return modes.reindex(cluster_ids, fill_value=default)
+
+cluster_analysis = pd.DataFrame({
+    'Count': hotspot_df.groupby('Cluster_ID')['Animal ID'].count(),
+    'Avg_Age': cluster_mode(hotspot_df, 'Age upon Outcome', cluster_ids, 'N/A'),
+    'Most_Common_Type': cluster_mode(hotspot_df, 'Animal Type', cluster_ids),
+    'Most_Common_Breed': cluster_mode(hotspot_df, 'Reduced_Breed', cluster_ids),
+    'Most_Common_Season': cluster_mode(hotspot_df, 'Season', cluster_ids),
+}).rename_axis('Cluster_ID').reset_index()
 
 # Calculate the percentage of the non-adopted population each cluster represents
-cluster_analysis['Percentage'] = (cluster_analysis['Count'] / len(hotspot_df)) * 100
+cluster_analysis['Percentage'] = ((cluster_analysis['Count'] / len(hotspot_df)) * 100).astype(np.float32)
+cluster_analysis['Count'] = cluster_analysis['Count'].astype(np.int32)
 
 # Get the directory of the output file
 output_path = '../data/hotspot_clusters.csv'
 output_dir = os.path.dirname(output_path)
 
 # --- THE FIX ---
-# Check if the directory exists, if not, create it
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
+# Create the directory if needed (no-op when it already exists, no exists/makedirs race)
+os.makedirs(output_dir, exist_ok=True)
 
 # Save the cluster analysis to CSV
 cluster_analysis.to_csv(output_path, index=False)
@@ -1,13 +1,18 @@
 import pandas as pd
+import numpy as np
 from prophet import Prophet
 import joblib 
 import os
+import importlib.util
+
+# lz4 is optional - fall back to zlib when it isn't installed
+MODEL_COMPRESSION = ('lz4', 3) if importlib.util.find_spec("lz4") is not None else ('zlib', 3)
 
 # --- 1. Define File Paths ---
 # The correct relative path to go up one directory and into the data folder
 DATA_PATH = r'D:\5sem\mini\ml_scripts\data\prophet_training_data.csv'
 MODEL_PATH = '../models/prophet_model.pkl'
-FORECAST_PATH = '../data/forecast_results.csv'
+FORECAST_PATH = '../data/forecast_results.parquet'
 FORECAST_PERIODS = 180 # Forecast 6 months
 
 print("Starting SmartPaws Prophet Model Training...")
@@ -17,6 +22,11 @@ try:
     df_prophet = pd.read_csv(DATA_PATH)
     df_prophet['ds'] = pd.to_datetime(df_prophet['ds'])
     print(f"Data loaded successfully. Total data points: {df_prophet.shape[0]}")
+
+    # Per-event rows repeat 'ds'; collapse them to daily totals so Stan fits days, not events
+    if df_prophet['ds'].duplicated().any():
+        df_prophet = df_prophet.groupby(pd.Grouper(key='ds', freq='D'))['y'].sum().reset_index()
+        print(f"Aggregated to {df_prophet.shape[0]} daily data points.")
 except FileNotFoundError:
     print(f"ERROR: Data file not found at {DATA_PATH}. Please ensure the data preparation step was run successfully.")
     exit()
@@ -28,7 +38,8 @@ model = Prophet(
     weekly_seasonality=True,
     yearly_seasonality=True,
     daily_seasonality=False,
-    seasonality_mode='multiplicative' # Use multiplicative for seasonal growth
+    seasonality_mode='multiplicative', # Use multiplicative for seasonal growth
+    uncertainty_samples=200 # Fewer posterior draws for yhat_lower/upper; predict cost scales with this
 )
 model.fit(df_prophet)
 print("Model training complete.")
@@ -37,7 +48,7 @@ print("Model training complete.")
 # --- 4. Save the Trained Model ---
 try:
     os.makedirs('../models', exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
+    joblib.dump(model, MODEL_PATH, compress=MODEL_COMPRESSION)
     print(f"Trained Prophet model saved to {MODEL_PATH}")
 except Exception as e:
     print(f"ERROR: Could not save model. Error: {e}")
@@ -51,8 +62,13 @@ future = model.make_future_dataframe(periods=FORECAST_PERIODS, include_history=F
 forecast = model.predict(future)
 
 # Save the necessary forecast results for the dashboard
-forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_csv(
-    FORECAST_PATH, index=False)
+# (interval columns are absent if uncertainty_samples is ever set to 0)
+forecast_columns = [col for col in ['ds', 'yhat', 'yhat_lower', 'yhat_upper'] if col in forecast.columns]
+
+# float32 is plenty for adoption counts and halves the bytes written (Parquet keeps the dtype on read)
+forecast = forecast[forecast_columns].astype({col: np.float32 for col in forecast_columns[1:]})
+forecast.to_parquet(
+    FORECAST_PATH, compression='zstd', index=False)
 print(f"Forecast results saved to {FORECAST_PATH}")
 
 print("\nAdoption Trend Forecasting feature complete.")
\ No newline at end of file
@@ -15,7 +15,7 @@ try:
     outcomes_df = pd.read_csv(os.path.join(DATA_DIR, r'D:\5sem\mini\data\Austin_Animal_Center_Outcomes.csv'))
     
     # Load the forecast and hotspot data
-    forecast_df = pd.read_csv(os.path.join(DATA_DIR, r'D:\5sem\mini\data\forecast_results.csv'))
+    forecast_df = pd.read_parquet(os.path.join(DATA_DIR, r'D:\5sem\mini\data\forecast_results.parquet'))
     hotspot_clusters_df = pd.read_csv(os.path.join(DATA_DIR, r'D:\5sem\mini\data\hotspot_clusters.csv'))
 except FileNotFoundError as e:
     print(f"Error loading data: {e}. Please ensure all result files are in the 'data/' directory.")
@@ -90,7 +90,7 @@ if 'ds' in forecast_df.columns and 'yhat' in forecast_df.columns:
     fig_forecast.write_html(os.path.join(DATA_DIR, 'adoption_forecast.html'))
     print("Interactive Forecast Plot saved to ../data/adoption_forecast.html")
 else:
-    print("Error: Required columns for Forecast Plot visualization not found in forecast_results.csv.")
+    print("Error: Required columns for Forecast Plot visualization not found in forecast_results.parquet.")
 
 
 # --- 6. Display Hotspot Cluster Analysis ---